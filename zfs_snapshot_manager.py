@@ -5,30 +5,189 @@ import curses
 import subprocess
 import os
 import re
+import shlex
+import shutil
+import signal
+import sys
 import time
 import argparse
 import threading
 import json
+import selectors
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from itertools import chain, islice
+from operator import itemgetter
+
+# Long running root shell that serves zfs diff requests, one snapshot name
+# per line, so sudo is only invoked once per session
+DIFF_HELPER_SENTINEL = "--zfs-diff-done--"
+DIFF_HELPER_SCRIPT = (
+    'while IFS= read -r snap; do '
+    'zfs diff -FH "$snap" "${snap%%@*}" 2>&1; '
+    f'echo "{DIFF_HELPER_SENTINEL} $?"; '
+    'done'
+)
+
+# Sort key for each sortable column, reading fields precomputed at parse time
+SORT_KEYS = {
+    'name': itemgetter('name'),
+    'used': itemgetter('used_bytes'),
+    'refer': itemgetter('refer_bytes'),
+    'creation': itemgetter('creation_epoch'),
+}
+
+# Regions of the main screen that can be redrawn on their own
+SCREEN_REGIONS = ('header', 'rows', 'status')
+
+# The list is drawn into a pad holding this many rows around the visible
+# window, so moving and scrolling only copy from it instead of redrawing
+PAD_ROWS = 1024
+# Minimum pad width, wide enough for every column of a row
+PAD_COLS = 90
+
+# Key codes tested outside the key maps, computed once rather than on
+# every key press
+KEY_QUIT = ord('q')
+KEY_YES = (ord('y'), ord('Y'))
+KEY_NO = (ord('n'), ord('N'), 27)  # n, N or ESC
+KEY_CANCEL = ord('c')
+KEY_FIRST_TARGET = ord('1')
+
+# Seconds a status message stays on screen
+STATUS_TIMEOUT = 5
+
+# Unit suffixes used by zfs for human readable sizes
+SIZE_UNITS = "BKMGTPE"
+
+def format_size(num):
+    """Format a byte count the way zfs does (zfs_nicenum)
+
+    >>> [format_size(n) for n in (0, 512, 1024, 8192, 98304, 2 * 1024 ** 3)]
+    ['0B', '512B', '1K', '8K', '96K', '2G']
+    >>> [format_size(n) for n in (1536, 102399, 1048575, 1288490189)]
+    ['1.50K', '100K', '1024K', '1.20G']
+    """
+    # Like zfs, pick the unit by integer division, so 1048575 shows as 1024K
+    n = num
+    index = 0
+    while n >= 1024 and index < len(SIZE_UNITS) - 1:
+        n //= 1024
+        index += 1
+    unit = SIZE_UNITS[index]
+    if num % 1024 ** index == 0:
+        return f"{n}{unit}"
+    size = num / 1024 ** index
+
+    # At most five characters including the unit, judged after rounding so
+    # 102399 shows as 100K rather than 100.0K
+    for precision in (2, 1, 0):
+        text = f"{size:.{precision}f}"
+        if len(text) <= 4:
+            break
+    return f"{text}{unit}"
+
+# Readable names for the change and file type columns of zfs diff -FH
+DIFF_CHANGE_TYPES = {
+    '-': "Removed",
+    '+': "Added",
+    'M': "Modified",
+    'R': "Renamed"
+}
+DIFF_FILE_TYPES = {
+    'F': "File",
+    '/': "Directory",
+    '@': "Symlink",
+    'P': "Pipe",
+    '=': "Socket",
+    '>': "Door",
+    '|': "FIFO"
+}
+
+def format_diff_line(line):
+    """Format a line of zfs diff -FH output for reading, e.g. "Added File: /a"
+
+    Lines that are not changes (such as error messages) are returned as is.
+    """
+    parts = line.rstrip('\n').split('\t')
+    if len(parts) < 3:
+        return line
+    change_type, file_type, path = parts[:3]
+    return (f"{DIFF_CHANGE_TYPES.get(change_type, change_type)} "
+            f"{DIFF_FILE_TYPES.get(file_type, file_type)}: {path}\n")
+
+# Navigation moves, each takes the position, list length and page size and
+# returns the new position
+def nav_up(pos, n, page_step):
+    """Move up one row"""
+    return max(0, pos - 1)
+
+def nav_down(pos, n, page_step):
+    """Move down one row"""
+    return min(n - 1, pos + 1)
+
+def nav_first(pos, n, page_step):
+    """Jump to the first row"""
+    return 0
+
+def nav_last(pos, n, page_step):
+    """Jump to the last row"""
+    return n - 1
+
+def nav_page_up(pos, n, page_step):
+    """Move up one page"""
+    return max(0, pos - page_step)
+
+def nav_page_down(pos, n, page_step):
+    """Move down one page"""
+    return min(n - 1, pos + page_step)
 
 class ZFSSnapshotManager:
-    def __init__(self, stdscr, pools=None):
+    def __init__(self, stdscr, pools=None, max_depth=None):
         self.stdscr = stdscr
         self.pools = pools or self.get_all_pools()
+        self.max_depth = max_depth  # None lists every descendant dataset
         self.snapshots = []
+        self._all_snapshots = []  # Unfiltered list as returned by zfs
+        self._filtered_snapshots = None  # Cached apply_filter() result
+        self._name_index = None  # Lowercase names and snapshots sorted by name
         self.current_pos = 0
         self.offset = 0
-        self.max_rows = 0
-        self.max_cols = 0
+        # Terminal size, only read again when the terminal is resized
+        self.max_rows, self.max_cols = stdscr.getmaxyx()
         self.status_message = ""
         self.status_time = 0
         self.filter_text = ""
+        self.filter_regex = False  # Match filter_text as a regular expression
         self.is_filtering = False
         self.help_mode = False
         self.loading = False
-        self.remote_targets = self.load_remote_targets()
+        # Set when the screen needs redrawing; all drawing happens on the
+        # main loop since curses is not thread safe
+        self._dirty = threading.Event()
+        self._dirty_regions = set()
+        # The main loop sleeps until a key arrives on stdin or a byte on this
+        # pipe, written when another thread invalidates or the terminal resizes
+        self._wakeup_read, self._wakeup_write = os.pipe()
+        os.set_blocking(self._wakeup_read, False)
+        os.set_blocking(self._wakeup_write, False)
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(sys.stdin, selectors.EVENT_READ)
+        self._selector.register(self._wakeup_read, selectors.EVENT_READ)
+        self._resized = False
+        self._remote_targets = None  # Loaded on first use
+        self._config_lock = threading.Lock()
         self.sort_column = 'name'  # Default sort by name
         self.sort_reverse = True   # Default newest first
+        self._browser = None  # File browser command, looked up on first browse
+        self._diff_helper = None  # Started on first diff
+        self._diff_helper_failed = False  # sudo refused the helper, use one-off zfs diff
+        self._send_worker = None  # Thread running the current snapshot send
+        self.pad = None  # Rendered list rows, created on first draw
+        self._pad_base = 0  # Index of the snapshot on the first pad row
+        self._pad_source = None  # List the pad was filled from
+        self._pad_selected = None  # Index of the row highlighted in the pad
 
         # Initialize colors
         curses.start_color()
@@ -39,24 +198,73 @@ class ZFSSnapshotManager:
         curses.init_pair(4, curses.COLOR_YELLOW, -1) # Highlights
         curses.init_pair(5, curses.COLOR_MAGENTA, -1) # Special items
 
+        # Drawing attributes, combined once instead of on every draw
+        self._attr_header = curses.color_pair(1) | curses.A_BOLD  # Titles and column headers
+        self._attr_frame = curses.color_pair(1)  # Pools, separator and key hints
+        self._attr_selected = curses.color_pair(2) | curses.A_BOLD
+        self._attr_error = curses.color_pair(3)
+        self._attr_warning = curses.color_pair(3) | curses.A_BOLD
+        self._attr_highlight = curses.color_pair(4)
+        self._attr_loading = curses.color_pair(4) | curses.A_BOLD
+
+        # Key bindings, built once so each key press is a single dict lookup
+        self._keymap = {
+            curses.KEY_MOUSE: self.handle_mouse,
+            curses.KEY_RESIZE: self.handle_resize,
+            ord('h'): self.toggle_help,
+            ord('?'): self.toggle_help,
+            ord('r'): self.refresh_snapshots,
+            ord('/'): self.handle_filter,
+            ord('D'): self.delete_snapshot,
+            ord('d'): self.show_snapshot_diff,
+            ord('m'): self.mount_snapshot,
+            ord('u'): self.unmount_snapshot,
+            ord('b'): self.browse_snapshot,
+            ord('s'): self.send_snapshot,
+            ord('a'): self.add_remote_target,
+        }
+        # Keys that only move the cursor, handled in batches by the main loop
+        self._navmap = {
+            curses.KEY_UP: nav_up,
+            ord('k'): nav_up,
+            curses.KEY_DOWN: nav_down,
+            ord('j'): nav_down,
+            curses.KEY_HOME: nav_first,
+            ord('g'): nav_first,
+            curses.KEY_END: nav_last,
+            ord('G'): nav_last,
+            curses.KEY_PPAGE: nav_page_up,
+            curses.KEY_NPAGE: nav_page_down,
+        }
+
         # Hide cursor
         curses.curs_set(0)
 
         # Enable mouse events
         curses.mousemask(curses.ALL_MOUSE_EVENTS)
 
+        # ncurses only reports resizes from inside getch, which the main loop
+        # no longer blocks in
+        signal.signal(signal.SIGWINCH, self.handle_sigwinch)
+
         # Get initial snapshots
         self.refresh_snapshots()
 
     
 
+    @property
+    def remote_targets(self):
+        """Remote targets, read from the config file on first access"""
+        if self._remote_targets is None:
+            self._remote_targets = self.load_remote_targets()
+        return self._remote_targets
+
     def load_remote_targets(self):
         """Load remote targets from config file"""
         config_dir = os.path.expanduser("~/.config/zfs-snapshot-manager")
         config_file = os.path.join(config_dir, "remote_targets.json")
 
-        if not os.path.exists(config_dir):
-            os.makedirs(config_dir)
+        os.makedirs(config_dir, exist_ok=True)
 
         if os.path.exists(config_file):
             try:
@@ -72,12 +280,21 @@ class ZFSSnapshotManager:
             return default_config
 
     def save_remote_targets(self):
-        """Save remote targets to config file"""
+        """Save remote targets to config file in the background"""
+        threading.Thread(target=self._save_remote_targets_thread).start()
+
+    def _save_remote_targets_thread(self):
         config_dir = os.path.expanduser("~/.config/zfs-snapshot-manager")
         config_file = os.path.join(config_dir, "remote_targets.json")
 
-        with open(config_file, 'w') as f:
-            json.dump(self.remote_targets, f, indent=2)
+        # One writer at a time, each writing the latest list, so the file
+        # always ends up with the most recent targets
+        with self._config_lock:
+            try:
+                with open(config_file, 'w') as f:
+                    json.dump(list(self._remote_targets), f, indent=2)
+            except OSError as e:
+                self.set_status(f"Error saving remote targets: {str(e)}", error=True)
 
     def get_all_pools(self):
         """Get all ZFS pools on the system"""
@@ -91,106 +308,184 @@ class ZFSSnapshotManager:
     def refresh_snapshots(self):
         """Get all snapshots for the specified pools"""
         self.loading = True
-        self.draw_screen()
+        self.invalidate()
+
+        self.start_worker(self._refresh_snapshots_thread)
+
+    def start_worker(self, target, *args):
+        """Run target on a background thread; it reports back through
+        set_status() and invalidate(), which wake up the main loop"""
+        worker = threading.Thread(target=target, args=args)
+        worker.start()
+        return worker
+
+    def _list_pool_snapshots(self, pool):
+        """List and parse the snapshots of a single pool"""
+        snapshots = []
+        # -p gives exact byte counts and creation as seconds since the epoch
+        cmd = ["zfs", "list", "-t", "snapshot", "-o", "name,used,refer,creation", "-H", "-p"]
+        if self.max_depth is not None:
+            # Bounding the depth keeps zfs from walking every descendant dataset.
+            # A dataset's snapshots are one level below it, hence the + 1.
+            cmd += ["-d", str(self.max_depth + 1)]
+        else:
+            cmd.append("-r")
+        cmd.append(pool)
+
+        # Parse the output as it streams in instead of buffering all of it
+        with subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                              text=True, bufsize=1 << 16) as proc:
+            for line in proc.stdout:
+                parts = line.rstrip('\n').split('\t', 3)
+                if len(parts) == 4:
+                    name, used, refer, creation = parts
+                    # Creation time is already seconds since the epoch
+                    creation_epoch = int(creation)
+                    creation_str = datetime.fromtimestamp(creation_epoch).strftime("%Y-%m-%d %H:%M")
+
+                    used_bytes = int(used)
+                    refer_bytes = int(refer)
+                    # Name truncated to fit the SNAPSHOT column
+                    display_name = name if len(name) <= 48 else name[:45] + "..."
+                    snapshots.append({
+                        'name': name,
+                        'name_lower': name.lower(),
+                        # The whole list row, formatted once instead of on every draw
+                        'row': f"{display_name:<50}{format_size(used_bytes):<10}"
+                               f"{format_size(refer_bytes):<10}{creation_str}",
+                        'used_bytes': used_bytes,
+                        'refer_bytes': refer_bytes,
+                        'creation_epoch': creation_epoch
+                    })
+
+        if proc.returncode != 0:
+            return []
 
-        threading.Thread(target=self._refresh_snapshots_thread).start()
+        return snapshots
 
     def _refresh_snapshots_thread(self):
         try:
             snapshots = []
-            for pool in self.pools:
-                cmd = ["zfs", "list", "-t", "snapshot", "-o", "name,used,refer,creation", "-H", "-r", pool]
-                result = subprocess.run(cmd, capture_output=True, text=True)
-
-                if result.returncode == 0:
-                    for line in result.stdout.splitlines():
-                        parts = line.strip().split('\t')
-                        if len(parts) == 4:
-                            name, used, refer, creation = parts
-                            # Parse creation time
-                            try:
-                                creation_time = datetime.strptime(creation, "%a %b %d %H:%M %Y")
-                                creation_str = creation_time.strftime("%Y-%m-%d %H:%M")
-                            except ValueError:
-                                creation_str = creation
-
-                            snapshots.append({
-                                'name': name,
-                                'used': used,
-                                'refer': refer,
-                                'creation': creation_str,
-                                'full_creation': creation
-                            })
-
-            # Sort snapshots based on current sort settings
-            if self.sort_column == 'name':
-                self.snapshots = sorted(snapshots, key=lambda x: x['name'], reverse=self.sort_reverse)
-            elif self.sort_column == 'used':
-                # Convert size strings (like 1K, 2M, 3G) to bytes for proper sorting
-                def size_to_bytes(size_str):
-                    units = {'B': 1, 'K': 1024, 'M': 1024**2, 'G': 1024**3, 'T': 1024**4}
-                    if size_str == '-' or size_str == '0':
-                        return 0
-                    size = float(size_str[:-1])
-                    unit = size_str[-1].upper()
-                    return int(size * units.get(unit, 1))
-
-                self.snapshots = sorted(snapshots, key=lambda x: size_to_bytes(x['used']), reverse=self.sort_reverse)
-            elif self.sort_column == 'refer':
-                # Same size conversion for 'refer' column
-                self.snapshots = sorted(snapshots, key=lambda x: size_to_bytes(x['refer']), reverse=self.sort_reverse)
-            elif self.sort_column == 'creation':
-                self.snapshots = sorted(snapshots, key=lambda x: x['full_creation'], reverse=self.sort_reverse)
-
-
-            # Apply filter if active
-            if self.filter_text:
-                self.apply_filter()
+            # List all pools concurrently; the zfs calls are I/O bound so the
+            # total wait is the slowest pool rather than the sum of all pools
+            if self.pools:
+                with ThreadPoolExecutor(max_workers=len(self.pools)) as executor:
+                    for pool_snapshots in executor.map(self._list_pool_snapshots, self.pools):
+                        snapshots.extend(pool_snapshots)
+
+            self._all_snapshots = snapshots
+            self._filtered_snapshots = None
+            self._name_index = None
+            self._resort_and_filter()
 
         except Exception as e:
             self.set_status(f"Error: {str(e)}", error=True)
 
         self.loading = False
-        self.draw_screen()
+        self.invalidate()
+
+    def _resort_and_filter(self):
+        """Rebuild the displayed list from the last zfs listing"""
+        # Apply filter if active
+        snapshots = self.apply_filter()
+
+        # Sort snapshots based on current sort settings. The result is only
+        # assigned once so the main loop never draws a half-built list.
+        self.snapshots = sorted(snapshots, key=SORT_KEYS[self.sort_column], reverse=self.sort_reverse)
 
     def apply_filter(self):
-        """Apply filter to snapshots"""
-        if not self.filter_text:
-            return
+        """Return the snapshots matching the filter"""
+        # Reuse the last result until the filter or the listing changes
+        if self._filtered_snapshots is None:
+            if not self.filter_text:
+                self._filtered_snapshots = self._all_snapshots
+            elif self.filter_regex:
+                # Compiled once per filter rather than parsed for every name
+                try:
+                    search = re.compile(self.filter_text, re.IGNORECASE).search
+                except re.error as e:
+                    self.set_status(f"Invalid filter: {e}", error=True)
+                    search = None
+                self._filtered_snapshots = [snap for snap in self._all_snapshots
+                                            if search and search(snap['name'])]
+            elif self.filter_text.startswith('^'):
+                # Prefix match, a slice of the name index found by bisection
+                prefix = self.filter_text[1:].lower()
+                names, by_name = self.get_name_index()
+                first = bisect_left(names, prefix)
+                last = bisect_left(names, prefix + '\uffff', first)
+                self._filtered_snapshots = by_name[first:last]
+            else:
+                filter_text = self.filter_text.lower()
+                self._filtered_snapshots = [snap for snap in self._all_snapshots
+                                            if filter_text in snap['name_lower']]
 
-        filtered = []
-        for snap in self.snapshots:
-            if self.filter_text.lower() in snap['name'].lower():
-                filtered.append(snap)
+        return self._filtered_snapshots
 
-        self.snapshots = filtered
+    def get_name_index(self):
+        """Return the lowercase snapshot names in sorted order, along with
+        the snapshots in the same order"""
+        if self._name_index is None:
+            by_name = sorted(self._all_snapshots, key=itemgetter('name_lower'))
+            self._name_index = ([snap['name_lower'] for snap in by_name], by_name)
+        return self._name_index
 
     def set_status(self, message, error=False):
         """Set a status message with timestamp"""
         self.status_message = message
         self.status_time = time.time()
         if error:
-            self.status_color = curses.color_pair(3)
+            self.status_color = self._attr_error
         else:
-            self.status_color = curses.color_pair(4)
+            self.status_color = self._attr_highlight
+        self.invalidate('status')
 
-    def draw_screen(self):
-        """Draw the main interface"""
-        self.stdscr.clear()
-        self.max_rows, self.max_cols = self.stdscr.getmaxyx()
+    def invalidate(self, *regions):
+        """Mark regions of the screen ('header', 'rows', 'status') for redrawing
+
+        Without arguments the whole screen is redrawn.
+        """
+        self._dirty_regions.update(regions or SCREEN_REGIONS)
+        if not self._dirty.is_set():
+            self._dirty.set()
+            self.wake()
+
+    def wake(self):
+        """Wake up the main loop if it is waiting for input"""
+        try:
+            os.write(self._wakeup_write, b'x')
+        except BlockingIOError:
+            pass  # The pipe is full, the main loop is already due to wake up
+
+    def draw_screen(self, regions=None):
+        """Draw the main interface, or only the given regions of it"""
+        # Header changes, help and the loading message need the whole screen
+        if regions is not None and 'header' not in regions and not self.help_mode and not self.loading:
+            if 'rows' in regions:
+                self.draw_list()
+            if 'status' in regions:
+                self.draw_status()
+            self.stdscr.noutrefresh()
+            if 'rows' in regions:
+                self.show_pad()
+            return
+
+        # erase() rather than clear(), so ncurses only sends the cells that
+        # changed instead of repainting the whole terminal
+        self.stdscr.erase()
 
         # Draw title
         title = "ZFS Snapshot Manager"
-        self.stdscr.addstr(0, (self.max_cols - len(title)) // 2, title, curses.color_pair(1) | curses.A_BOLD)
+        self.stdscr.addstr(0, (self.max_cols - len(title)) // 2, title, self._attr_header)
 
         # Draw pools info
         pools_str = f"Pools: {', '.join(self.pools)}"
-        self.stdscr.addstr(1, 0, pools_str, curses.color_pair(1))
+        self.stdscr.addstr(1, 0, pools_str, self._attr_frame)
 
         # Draw filter if active
         if self.is_filtering:
-            filter_prompt = f"Filter: {self.filter_text}"
-            self.stdscr.addstr(1, self.max_cols - len(filter_prompt) - 1, filter_prompt, curses.color_pair(4))
+            filter_prompt = f"{'Regex' if self.filter_regex else 'Filter'}: {self.filter_text}"
+            self.stdscr.addstr(1, self.max_cols - len(filter_prompt) - 1, filter_prompt, self._attr_highlight)
 
         # Draw help mode or loading indicator
         if self.help_mode:
@@ -199,17 +494,10 @@ class ZFSSnapshotManager:
         elif self.loading:
             loading_text = "Loading snapshots... Please wait."
             self.stdscr.addstr(self.max_rows // 2, (self.max_cols - len(loading_text)) // 2, 
-                              loading_text, curses.color_pair(4) | curses.A_BOLD)
-            self.stdscr.refresh()
+                              loading_text, self._attr_loading)
+            self.stdscr.noutrefresh()
             return
 
-        # Draw column headers
-        header_y = 3
-        self.stdscr.addstr(header_y, 0, "SNAPSHOT", curses.color_pair(1) | curses.A_BOLD)
-        self.stdscr.addstr(header_y, 50, "USED", curses.color_pair(1) | curses.A_BOLD)
-        self.stdscr.addstr(header_y, 60, "REFER", curses.color_pair(1) | curses.A_BOLD)
-        self.stdscr.addstr(header_y, 70, "CREATION", curses.color_pair(1) | curses.A_BOLD)
-
         # Draw column headers with sort indicators
         header_y = 3
         headers = [
@@ -226,66 +514,204 @@ class ZFSSnapshotManager:
                 header = f"{header} {indicator}"
 
             # Highlight headers to indicate they're clickable
-            self.stdscr.addstr(header_y, pos, header, curses.color_pair(1) | curses.A_BOLD)
+            self.stdscr.addstr(header_y, pos, header, self._attr_header)
 
         # Draw separator
-        self.stdscr.addstr(header_y + 1, 0, "─" * (self.max_cols - 1), curses.color_pair(1))
+        self.stdscr.addstr(header_y + 1, 0, "─" * (self.max_cols - 1), self._attr_frame)
+
+        self.draw_list()
+        self.draw_status()
+
+        # Draw key hints
+        help_text = "Press 'h' for help | q:Quit | r:Refresh | d:Show Diff | D:Delete | m:Mount | b:Browse | s:Send | j/k:Up & Down"
+        if len(help_text) > self.max_cols:
+            help_text = help_text[:self.max_cols-3] + "..."
+        self.stdscr.addstr(self.max_rows - 1, 0, help_text, self._attr_frame)
+
+        # The pad goes on top of the blanked list band
+        self.stdscr.noutrefresh()
+        self.show_pad()
 
+    def draw_list(self):
+        """Draw the band of the screen holding the snapshot list"""
         # Calculate visible items
         visible_rows = self.max_rows - 7  # Account for headers and status
 
+        # Blank the band first, the list may have become shorter
+        for y in range(5, 5 + visible_rows):
+            self.stdscr.move(y, 0)
+            self.stdscr.clrtoeol()
+
         if not self.snapshots:
             if not self.loading:
                 no_snaps = "No snapshots found. Press 'r' to refresh."
                 self.stdscr.addstr(self.max_rows // 2, (self.max_cols - len(no_snaps)) // 2, 
-                                  no_snaps, curses.color_pair(4))
+                                  no_snaps, self._attr_highlight)
         else:
             # Adjust offset if needed
             if self.current_pos >= len(self.snapshots):
                 self.current_pos = len(self.snapshots) - 1
 
-            if self.current_pos < self.offset:
-                self.offset = self.current_pos
-            elif self.current_pos >= self.offset + visible_rows:
-                self.offset = self.current_pos - visible_rows + 1
+            self.scroll_to_cursor()
 
-            # Draw snapshots
-            for i in range(min(visible_rows, len(self.snapshots))):
-                if self.offset + i >= len(self.snapshots):
-                    break
+    def draw_status(self):
+        """Draw the status line"""
+        self.stdscr.move(self.max_rows - 2, 0)
+        self.stdscr.clrtoeol()
+        if self.status_message and time.time() - self.status_time < STATUS_TIMEOUT:
+            self.stdscr.addnstr(self.max_rows - 2, 0, self.status_message, self.max_cols - 1, self.status_color)
+
+    def scroll_to_cursor(self):
+        """Adjust the offset so the selected row is visible"""
+        visible_rows = self.max_rows - 7
+        if self.current_pos < self.offset:
+            self.offset = self.current_pos
+        elif self.current_pos >= self.offset + visible_rows:
+            self.offset = self.current_pos - visible_rows + 1
+
+    def draw_rows(self, base):
+        """Fill the pad with the snapshot rows starting at index base"""
+        rows = max(PAD_ROWS, self.max_rows)
+        cols = max(PAD_COLS, self.max_cols)
+        if self.pad is None or self.pad.getmaxyx() != (rows, cols):
+            self.pad = curses.newpad(rows, cols)
+        else:
+            self.pad.erase()
+
+        self._pad_base = base
+        self._pad_source = self.snapshots
+        self._pad_selected = None
+
+        for y, snap in enumerate(self.snapshots[base:base + rows]):
+            self.pad.addnstr(y, 0, snap['row'], cols - 1)
+
+        # Highlight selected item
+        self.move_highlight()
+
+    def move_highlight(self):
+        """Move the highlight in the pad to the selected row by changing the
+        attributes of the old and new rows, without rewriting them"""
+        last = min(len(self.snapshots), self._pad_base + self.pad.getmaxyx()[0])
+        if self._pad_selected is not None and self._pad_base <= self._pad_selected < last:
+            self.pad.chgat(self._pad_selected - self._pad_base, 0, -1, curses.A_NORMAL)
+        if self._pad_base <= self.current_pos < last:
+            self.pad.chgat(self.current_pos - self._pad_base, 0, -1, self._attr_selected)
+        self._pad_selected = self.current_pos
+
+    def show_pad(self):
+        """Copy the visible window of the list from the pad to the screen"""
+        shown = min(self.max_rows - 7, len(self.snapshots) - self.offset)
+        if self.help_mode or self.loading or shown <= 0:
+            return
 
-                snap = self.snapshots[self.offset + i]
-                y = header_y + 2 + i
+        # Refill the pad when the list changed or the window left it
+        if (self.pad is None or self._pad_source is not self.snapshots
+                or self.pad.getmaxyx()[1] < self.max_cols
+                or self.offset < self._pad_base
+                or self.offset + shown > self._pad_base + self.pad.getmaxyx()[0]):
+            self.draw_rows(max(0, self.offset - (PAD_ROWS - shown) // 2))
+        elif self._pad_selected != self.current_pos:
+            # Only the highlight moves between two rows already in the pad
+            self.move_highlight()
 
-                # Highlight selected item
-                if self.offset + i == self.current_pos:
-                    attr = curses.color_pair(2) | curses.A_BOLD
-                else:
-                    attr = curses.A_NORMAL
+        self.pad.noutrefresh(self.offset - self._pad_base, 0, 5, 0, 4 + shown, self.max_cols - 1)
 
-                # Truncate name if needed
-                name = snap['name']
-                if len(name) > 48:
-                    name = name[:45] + "..."
+    def move_cursor(self, pos):
+        """Select another snapshot, updating the screen from the pad
 
-                self.stdscr.addstr(y, 0, name, attr)
-                self.stdscr.addstr(y, 50, snap['used'], attr)
-                self.stdscr.addstr(y, 60, snap['refer'], attr)
-                self.stdscr.addstr(y, 70, snap['creation'], attr)
+        Moving to the current position is a no-op and draws nothing.
+        """
+        old_pos = self.current_pos
+        self.current_pos = pos
 
-        # Draw status line
-        if self.status_message and time.time() - self.status_time < 5:
-            self.stdscr.addstr(self.max_rows - 2, 0, self.status_message, self.status_color)
+        if self.help_mode or pos == old_pos:
+            return
 
-        # Draw key hints
-        help_text = "Press 'h' for help | q:Quit | r:Refresh | d:Show Diff | D:Delete | m:Mount | b:Browse | s:Send | j/k:Up & Down"
-        if len(help_text) > self.max_cols:
-            help_text = help_text[:self.max_cols-3] + "..."
-        self.stdscr.addstr(self.max_rows - 1, 0, help_text, curses.color_pair(1))
+        # A redraw of the list is already pending, it will show the new position
+        if self._dirty_regions & {'header', 'rows'}:
+            return
 
-        self.stdscr.refresh()
+        # Stale screen contents need a full redraw; otherwise the pad already
+        # holds the rows and only its highlight and window move
+        if self.loading or self.is_filtering or pos >= len(self.snapshots):
+            self.invalidate('rows')
+            return
+
+        self.scroll_to_cursor()
+        self.show_pad()
+
+    def _run_zfs_diff_helper(self, snapshot_name):
+        """Run zfs diff through the long-running sudo helper, yielding its
+        output lines; sets _diff_helper_failed if the helper is unusable"""
+        if self._diff_helper is None:
+            # -n fails instead of prompting if sudo needs a password
+            self._diff_helper = subprocess.Popen(["sudo", "-n", "sh", "-c", DIFF_HELPER_SCRIPT],
+                                                 stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                                 stderr=subprocess.DEVNULL, text=True)
+
+        started = finished = False
+        try:
+            self._diff_helper.stdin.write(snapshot_name + "\n")
+            self._diff_helper.stdin.flush()
+
+            for line in self._diff_helper.stdout:
+                if line.startswith(DIFF_HELPER_SENTINEL):
+                    finished = True
+                    returncode = int(line.split()[1])
+                    if returncode != 0:
+                        raise subprocess.CalledProcessError(returncode, ["zfs", "diff", snapshot_name])
+                    return
+                started = True
+                yield line
+        except (OSError, ValueError):
+            pass
+        finally:
+            # Reading stopped halfway (e.g. the pager was quit); the rest of
+            # this diff must not be read as the start of the next one
+            if started and not finished and self._diff_helper is not None:
+                self._diff_helper.terminate()
+                self.close_diff_helper()
+
+        if started:
+            raise subprocess.CalledProcessError(1, ["zfs", "diff", snapshot_name])
+
+        # Exited without answering: remember it, so later diffs do not
+        # retry (and log) a sudo call that is refused every time
+        self._diff_helper_failed = True
+        self.close_diff_helper()
+
+    def run_zfs_diff(self, snapshot_name, dataset):
+        """Run zfs diff as root, yielding its output lines as they arrive
+
+        Errors are part of the output; a failure raises CalledProcessError
+        once the output is exhausted.
+        """
+        if not self._diff_helper_failed:
+            yield from self._run_zfs_diff_helper(snapshot_name)
+            if not self._diff_helper_failed:
+                return
+
+        # The helper could not be used (e.g. sudo only allows zfs, or wants a
+        # password), so fall back to a one-off sudo that is allowed to prompt
+        cmd = ["sudo", "zfs", "diff", "-FH", snapshot_name, dataset]
+        with subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True) as proc:
+            yield from proc.stdout
+        if proc.returncode != 0:
+            raise subprocess.CalledProcessError(proc.returncode, cmd)
+
+    def close_diff_helper(self):
+        """Stop the zfs diff helper if it is running"""
+        if self._diff_helper is None:
+            return
+
+        for pipe in (self._diff_helper.stdin, self._diff_helper.stdout):
+            try:
+                pipe.close()
+            except OSError:
+                pass
+        self._diff_helper.wait()
+        self._diff_helper = None
 
-    
     def show_snapshot_diff(self):
         """Show differences between selected snapshot and current dataset state"""
         if not self.snapshots or self.current_pos >= len(self.snapshots):
@@ -301,83 +727,53 @@ class ZFSSnapshotManager:
         # Extract dataset name from snapshot (everything before the @ symbol)
         dataset = snapshot_name.split('@')[0]
 
-        # Create a temporary file to store the diff output
-        import tempfile
-        with tempfile.NamedTemporaryFile(delete=False, mode='w+t') as temp_file:
-            temp_filename = temp_file.name
-
-        # Run the diff command
+        diff = self.run_zfs_diff(snapshot_name, dataset)
+        lines = []
         try:
-            # Use -H for parseable output, -F to show file types
-            result = subprocess.run(["sudo", "zfs", "diff", "-FH", snapshot_name, dataset], 
-                                capture_output=True, text=True)
-
-            if result.returncode != 0:
-                self.set_status(f"Error getting diff: {result.stderr}")
+            # zfs diff reports errors before any changes, so only the first
+            # line is read before deciding whether to start the pager
+            try:
+                lines.extend(islice(diff, 1))
+                if lines and lines[0].count('\t') < 2:
+                    lines.extend(diff)
+            except subprocess.CalledProcessError:
+                self.set_status(f"Error getting diff: {''.join(lines).strip()}")
                 return
 
-            diff_output = result.stdout
-
             # If no differences found
-            if not diff_output.strip():
+            if not lines:
                 self.set_status("No differences found between snapshot and current state")
                 return
 
-            # Format the diff output for better readability
-            formatted_output = []
-            for line in diff_output.strip().split('\n'):
-                parts = line.split('\t')
-                if len(parts) >= 3:
-                    change_type = parts[0]
-                    file_type = parts[1]
-                    path = parts[2]
-
-                    # Convert change type symbols to more readable format
-                    type_desc = {
-                        '-': "Removed",
-                        '+': "Added",
-                        'M': "Modified",
-                        'R': "Renamed"
-                    }.get(change_type, change_type)
-
-                    # Convert file type symbols
-                    file_desc = {
-                        'F': "File",
-                        '/': "Directory",
-                        '@': "Symlink",
-                        'P': "Pipe",
-                        '=': "Socket",
-                        '>': "Door",
-                        '|': "FIFO"
-                    }.get(file_type, file_type)
-
-                    formatted_output.append(f"{type_desc} {file_desc}: {path}")
-
-            # Write formatted output to temp file
-            with open(temp_filename, 'w') as f:
-                f.write(f"Differences between {snapshot_name} and current state:\n\n")
-                f.write("\n".join(formatted_output))
-
             # Temporarily exit curses to show the diff
             curses.endwin()
 
-            # Use less to display the diff with pagination
-            subprocess.run(["less", "-R", temp_filename])
+            # Stream the diff into less as zfs produces it, so it shows up
+            # right away and is never held in memory as a whole
+            pager = subprocess.Popen(["less", "-R"], stdin=subprocess.PIPE, text=True, bufsize=1)
+            try:
+                pager.stdin.write(f"Differences between {snapshot_name} and current state:\n\n")
+                for line in chain(lines, diff):
+                    pager.stdin.write(format_diff_line(line))
+            except subprocess.CalledProcessError:
+                pass  # The error message is already in the output
+            except BrokenPipeError:
+                pass  # less was quit before reaching the end
+            finally:
+                try:
+                    pager.stdin.close()
+                except BrokenPipeError:
+                    pass
+                pager.wait()
 
             # Restart curses
-            self.stdscr.refresh()
-            self.draw_screen()
+            curses.doupdate()
+            self.invalidate()
 
         except Exception as e:
             self.set_status(f"Error: {str(e)}")
         finally:
-            # Clean up temp file
-            try:
-                os.unlink(temp_filename)
-            except:
-                pass
-
-
+            diff.close()
 
     def draw_help(self):
         """Draw help screen"""
@@ -389,7 +785,7 @@ class ZFSSnapshotManager:
             ("", ""),
             ("Actions", ""),
             ("  r", "Refresh snapshot list"),
-            ("  /", "Filter snapshots by name"),
+            ("  /", "Filter snapshots by name (^ for a name prefix, Tab for regex)"),
             ("  d", "Show differences between snapshot and current state"),
             ("  D", "Delete selected snapshot"),
             ("  m", "Mount selected snapshot"),
@@ -399,28 +795,28 @@ class ZFSSnapshotManager:
             ("  a", "Add new remote target"),
             ("", ""),
             ("Other", ""),
-            ("  ?", "Show/hide this help"),
+            ("  h or ?", "Show/hide this help"),
             ("  q", "Quit"),
             ("  Click column headers", "Sort by that column"),
         ]
 
-        self.stdscr.clear()
+        self.stdscr.erase()
         title = "ZFS Snapshot Manager - Help"
-        self.stdscr.addstr(0, (self.max_cols - len(title)) // 2, title, curses.color_pair(1) | curses.A_BOLD)
+        self.stdscr.addstr(0, (self.max_cols - len(title)) // 2, title, self._attr_header)
 
         for i, (key, desc) in enumerate(help_items):
             if i + 2 >= self.max_rows:
                 break
 
             if not desc:  # This is a section header
-                self.stdscr.addstr(i + 2, 2, key, curses.color_pair(1) | curses.A_BOLD)
+                self.stdscr.addstr(i + 2, 2, key, self._attr_header)
             else:
-                self.stdscr.addstr(i + 2, 2, key, curses.color_pair(4))
+                self.stdscr.addstr(i + 2, 2, key, self._attr_highlight)
                 self.stdscr.addstr(i + 2, 20, desc)
 
         footer = "Press any key to return"
-        self.stdscr.addstr(self.max_rows - 1, (self.max_cols - len(footer)) // 2, footer, curses.color_pair(1))
-        self.stdscr.refresh()
+        self.stdscr.addstr(self.max_rows - 1, (self.max_cols - len(footer)) // 2, footer, self._attr_frame)
+        self.stdscr.noutrefresh()
 
     def delete_snapshot(self):
         """Delete the currently selected snapshot"""
@@ -432,31 +828,38 @@ class ZFSSnapshotManager:
 
         # Ask for confirmation
         self.stdscr.addstr(self.max_rows - 3, 0, f"Delete snapshot {name}? (y/n) ", 
-                          curses.color_pair(3) | curses.A_BOLD)
-        self.stdscr.refresh()
+                          self._attr_warning)
+        self.stdscr.noutrefresh()
 
         # Get user input
+        curses.doupdate()
+        self.stdscr.timeout(-1)
         while True:
             key = self.stdscr.getch()
-            if key in (ord('y'), ord('Y')):
+            if key in KEY_YES:
                 # Execute deletion
                 try:
                     subprocess.run(["zfs", "destroy", name], check=True, capture_output=True)
                     self.set_status(f"Snapshot {name} deleted successfully")
-                    # Remove from list
-                    self.snapshots.pop(self.current_pos)
-                    if self.current_pos >= len(self.snapshots) and len(self.snapshots) > 0:
-                        self.current_pos = len(self.snapshots) - 1
+                    # Remove from the lists by name, a refresh may have
+                    # replaced them (or already dropped it) while the
+                    # prompt was open
+                    self._all_snapshots = [s for s in self._all_snapshots if s['name'] != name]
+                    self._filtered_snapshots = None
+                    self._name_index = None
+                    self.snapshots = [s for s in self.snapshots if s['name'] != name]
+                    self._pad_source = None  # Rows below shifted up, refill the pad
+                    self.current_pos = max(0, min(self.current_pos, len(self.snapshots) - 1))
                 except subprocess.CalledProcessError as e:
                     self.set_status(f"Error deleting snapshot: {e.stderr.decode().strip()}", error=True)
                 break
-            elif key in (ord('n'), ord('N'), 27):  # n, N or ESC
+            elif key in KEY_NO:
                 break
 
         # Clear the confirmation line
         self.stdscr.move(self.max_rows - 3, 0)
         self.stdscr.clrtoeol()
-        self.draw_screen()
+        self.invalidate('rows', 'status')
 
     def mount_snapshot(self):
         """Mount the currently selected snapshot"""
@@ -483,7 +886,7 @@ class ZFSSnapshotManager:
         except OSError as e:
             self.set_status(f"Error creating mount point: {str(e)}", error=True)
 
-        self.draw_screen()
+        self.invalidate('status')
 
     def unmount_snapshot(self):
         """Unmount a mounted snapshot"""
@@ -499,8 +902,7 @@ class ZFSSnapshotManager:
 
         try:
             # Check if it's mounted
-            result = subprocess.run(["mount"], capture_output=True, text=True)
-            if mount_point not in result.stdout:
+            if not os.path.ismount(mount_point):
                 self.set_status(f"Snapshot not mounted at {mount_point}", error=True)
                 return
 
@@ -517,7 +919,7 @@ class ZFSSnapshotManager:
         except subprocess.CalledProcessError as e:
             self.set_status(f"Error unmounting snapshot: {e.stderr.decode().strip()}", error=True)
 
-        self.draw_screen()
+        self.invalidate('status')
 
     def browse_snapshot(self):
         """Browse the contents of the selected snapshot"""
@@ -545,22 +947,27 @@ class ZFSSnapshotManager:
         # Launch file browser
         try:
             # Determine which file browser to use
-            browsers = [
-                ("ncdu", ["ncdu", mount_point]),
-                ("yazi", ["yazi", mount_point]),
-                ("mc", ["mc", mount_point]),
-                ("ls", ["ls", "-lah", mount_point])
-            ]
-
-            for cmd, args in browsers:
-                if subprocess.run(["which", cmd], capture_output=True).returncode == 0:
-                    # Save terminal state
-                    curses.endwin()
-                    # Run browser
-                    subprocess.run(args)
-                    # Restore terminal state
-                    curses.doupdate()
-                    break
+            if self._browser is None:
+                browsers = [
+                    ("ncdu", []),
+                    ("yazi", []),
+                    ("mc", []),
+                    ("ls", ["-lah"])
+                ]
+
+                for cmd, args in browsers:
+                    path = shutil.which(cmd)
+                    if path:
+                        self._browser = [path] + args
+                        break
+
+            if self._browser:
+                # Save terminal state
+                curses.endwin()
+                # Run browser
+                subprocess.run(self._browser + [mount_point])
+                # Restore terminal state
+                curses.doupdate()
             else:
                 self.set_status("No suitable file browser found", error=True)
         finally:
@@ -575,7 +982,7 @@ class ZFSSnapshotManager:
                 except subprocess.CalledProcessError:
                     pass
 
-        self.draw_screen()
+        self.invalidate()
 
     def send_snapshot(self):
         """Send snapshot to a remote location"""
@@ -587,104 +994,115 @@ class ZFSSnapshotManager:
 
         if not self.remote_targets:
             self.set_status("No remote targets configured. Use 'a' to add one.", error=True)
-            self.draw_screen()
             return
 
         # Show target selection menu
-        self.stdscr.addstr(self.max_rows - 4, 0, "Select destination:", curses.color_pair(1) | curses.A_BOLD)
+        self.stdscr.addstr(self.max_rows - 5, 0, "Select destination:", self._attr_header)
 
         for i, target in enumerate(self.remote_targets):
             if i >= 3:  # Show max 3 targets
                 break
-            self.stdscr.addstr(self.max_rows - 3 + i, 2, f"{i+1}: {target['name']} ({target['host']}:{target['dataset']})")
+            self.stdscr.addstr(self.max_rows - 4 + i, 2, f"{i+1}: {target['name']} ({target['host']}:{target['dataset']})")
 
-        self.stdscr.addstr(self.max_rows - 3 + min(len(self.remote_targets), 3), 0, "Enter number or 'c' to cancel: ")
-        self.stdscr.refresh()
+        self.stdscr.addstr(self.max_rows - 4 + min(len(self.remote_targets), 3), 0, "Enter number or 'c' to cancel: ")
+        self.stdscr.noutrefresh()
 
         # Get user input
+        curses.doupdate()
+        self.stdscr.timeout(-1)
         choice = ""
         while True:
             key = self.stdscr.getch()
-            if key == ord('c'):
+            if key == KEY_CANCEL:
                 break
-            elif key in range(ord('1'), ord('1') + len(self.remote_targets) + 1):
+            elif key in range(KEY_FIRST_TARGET, KEY_FIRST_TARGET + len(self.remote_targets) + 1):
                 choice = chr(key)
                 break
 
-        # Clear menu
-        for i in range(5):
-            self.stdscr.move(self.max_rows - 4 + i, 0)
-            self.stdscr.clrtoeol()
+        # The menu reaches down to the key hints, so the whole screen is
+        # redrawn once it is gone
+        self.invalidate()
 
         if not choice:
-            self.draw_screen()
             return
 
         # Get selected target
         target_idx = int(choice) - 1
         if target_idx < 0 or target_idx >= len(self.remote_targets):
             self.set_status("Invalid selection", error=True)
-            self.draw_screen()
             return
 
         target = self.remote_targets[target_idx]
 
-        # Execute send command
+        if self._send_worker is not None and self._send_worker.is_alive():
+            self.set_status("A snapshot send is already in progress", error=True)
+            return
+
+        # Transfers can take hours, so they run in the background and report
+        # progress on the status line while the list stays usable
         self.set_status(f"Sending snapshot to {target['name']}...")
-        self.draw_screen()
+        self._send_worker = self.start_worker(self._send_snapshot_thread, name, target)
 
+    def _send_snapshot_thread(self, name, target):
         try:
-            # Build the command
+            # Build the receiving end of the pipe
             if target.get('use_ssh', True):
-                cmd = [
-                    "zfs", "send", name, "|", 
-                    "ssh", target['host'], 
-                    f"zfs receive -F {target['dataset']}"
-                ]
-                # Execute with shell=True since we have pipes
-                cmd_str = " ".join(cmd)
-
-                # Save terminal state
-                curses.endwin()
-                print(f"Executing: {cmd_str}")
-                print("Transfer in progress... This may take a while.")
-
-                result = subprocess.run(cmd_str, shell=True)
-
-                # Restore terminal state
-                curses.doupdate()
-
-                if result.returncode == 0:
-                    self.set_status(f"Snapshot sent successfully to {target['name']}")
-                else:
-                    self.set_status(f"Error sending snapshot. Exit code: {result.returncode}", error=True)
+                # There is no terminal to prompt on, fail instead of asking for a password
+                receive_cmd = ["ssh", "-o", "BatchMode=yes", target['host'],
+                               f"zfs receive -F {shlex.quote(target['dataset'])}"]
+                destination = target['name']
             else:
                 # Local send/receive
-                cmd = [
-                    "zfs", "send", name, "|", 
-                    "zfs", "receive", "-F", target['dataset']
-                ]
-                cmd_str = " ".join(cmd)
-
-                # Save terminal state
-                curses.endwin()
-                print(f"Executing: {cmd_str}")
-                print("Transfer in progress... This may take a while.")
-
-                result = subprocess.run(cmd_str, shell=True)
-
-                # Restore terminal state
-                curses.doupdate()
+                receive_cmd = ["zfs", "receive", "-F", target['dataset']]
+                destination = target['dataset']
 
-                if result.returncode == 0:
-                    self.set_status(f"Snapshot sent successfully to {target['dataset']}")
-                else:
-                    self.set_status(f"Error sending snapshot. Exit code: {result.returncode}", error=True)
+            # Pipe zfs send straight into the receiver, without a shell in between.
+            # -vP reports the total size and then the bytes sent every second.
+            sender = subprocess.Popen(["zfs", "send", "-v", "-P", name],
+                                      stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            try:
+                receiver = subprocess.Popen(receive_cmd, stdin=sender.stdout,
+                                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+            except OSError:
+                # Nothing will read the stream (e.g. ssh is not installed)
+                sender.kill()
+                sender.communicate()
+                raise
+            sender.stdout.close()  # zfs send gets SIGPIPE if the receiver exits early
+
+            total = None
+            for line in sender.stderr:
+                fields = line.decode(errors='replace').rstrip('\n').split('\t')
+                if fields[0] == 'size' and len(fields) == 2 and fields[1].isdigit():
+                    total = int(fields[1])
+                elif len(fields) == 3 and fields[1].isdigit():
+                    sent = int(fields[1])
+                    progress = format_size(sent)
+                    if total:
+                        progress += f" of {format_size(total)} ({min(100, sent * 100 // total)}%)"
+                    self.set_status(f"Sending snapshot to {destination}: {progress}")
+
+            receive_error = receiver.communicate()[1].decode(errors='replace').strip()
+            receive_code = receiver.returncode
+            send_code = sender.wait()
+            returncode = receive_code or send_code
+
+            if returncode == 0:
+                self.set_status(f"Snapshot sent successfully to {destination}")
+            elif receive_error:
+                self.set_status(f"Error sending snapshot: {receive_error.splitlines()[-1]}", error=True)
+            else:
+                self.set_status(f"Error sending snapshot. Exit code: {returncode}", error=True)
 
         except Exception as e:
             self.set_status(f"Error sending snapshot: {str(e)}", error=True)
 
-        self.draw_screen()
+    def wait_for_send(self):
+        """Let a running snapshot send finish instead of abandoning it on exit"""
+        if self._send_worker is not None and self._send_worker.is_alive():
+            curses.endwin()
+            print("Waiting for the snapshot send to finish...")
+            self._send_worker.join()
 
     def add_remote_target(self):
         """Add a new remote target"""
@@ -697,6 +1115,7 @@ class ZFSSnapshotManager:
         if not name:
             print("Cancelled.")
             curses.doupdate()
+            self.invalidate()
             return
 
         use_ssh = input("Use SSH? (y/n): ").lower().startswith('y')
@@ -706,6 +1125,7 @@ class ZFSSnapshotManager:
             if not host:
                 print("Cancelled.")
                 curses.doupdate()
+                self.invalidate()
                 return
         else:
             host = "local"
@@ -714,6 +1134,7 @@ class ZFSSnapshotManager:
         if not dataset:
             print("Cancelled.")
             curses.doupdate()
+            self.invalidate()
             return
 
         # Add the new target
@@ -732,40 +1153,58 @@ class ZFSSnapshotManager:
 
         # Restore terminal state
         curses.doupdate()
-        self.draw_screen()
+        self.invalidate()
 
     def handle_filter(self):
         """Handle filter input"""
         self.is_filtering = True
         self.filter_text = ""
+        self._filtered_snapshots = None
         self.draw_screen()
 
         # Show cursor for input
         curses.curs_set(1)
 
-        while True:
+        self.stdscr.timeout(-1)
+        while self.is_filtering:
+            curses.doupdate()
             key = self.stdscr.getch()
 
-            if key == 27:  # ESC
-                self.is_filtering = False
-                break
-            elif key == 10:  # Enter
-                self.is_filtering = False
-                # Apply filter
-                self.refresh_snapshots()
-                break
-            elif key == curses.KEY_BACKSPACE or key == 127:  # Backspace
-                if self.filter_text:
-                    self.filter_text = self.filter_text[:-1]
-            elif 32 <= key <= 126:  # Printable ASCII
-                self.filter_text += chr(key)
+            # Handle every key that is already waiting (e.g. pasted text)
+            # before redrawing once
+            self.stdscr.timeout(0)
+            while key != -1:
+                if key == 27:  # ESC
+                    self.is_filtering = False
+                    # Drop the partially typed filter
+                    self.filter_text = ""
+                    self._resort_and_filter()
+                    break
+                elif key == 10:  # Enter
+                    self.is_filtering = False
+                    # Apply filter
+                    self._resort_and_filter()
+                    break
+                elif key == 9:  # Tab switches between substring and regex matching
+                    self.filter_regex = not self.filter_regex
+                elif key == curses.KEY_BACKSPACE or key == 127:  # Backspace
+                    if self.filter_text:
+                        self.filter_text = self.filter_text[:-1]
+                elif 32 <= key <= 126:  # Printable ASCII
+                    self.filter_text += chr(key)
+                key = self.stdscr.getch()
+            self.stdscr.timeout(-1)
+
+            # A resize interrupts getch() without a key
+            self.apply_resize()
 
             # Redraw with updated filter
-            self.draw_screen()
+            if self.is_filtering:
+                self.draw_screen()
 
         # Hide cursor again
         curses.curs_set(0)
-        self.draw_screen()
+        self.invalidate()
 
     def toggle_sort(self, column):
         """Toggle sort column and direction"""
@@ -782,86 +1221,151 @@ class ZFSSnapshotManager:
                 self.sort_reverse = False
 
         # Re-sort the snapshots
-        self.refresh_snapshots()
+        self._resort_and_filter()
+        self.invalidate('header', 'rows')
 
     
 
+    def handle_mouse(self):
+        """Sort by the column whose header was clicked"""
+        try:
+            _, mx, my, _, _ = curses.getmouse()
+            # Check if click is on header row (row 3)
+            if my == 3:
+                # Determine which column was clicked
+                if 0 <= mx < 50:  # SNAPSHOT column
+                    self.toggle_sort('name')
+                elif 50 <= mx < 60:  # USED column
+                    self.toggle_sort('used')
+                elif 60 <= mx < 70:  # REFER column
+                    self.toggle_sort('refer')
+                elif 70 <= mx < self.max_cols:  # CREATION column
+                    self.toggle_sort('creation')
+        except curses.error:
+            pass
+
+    def toggle_help(self):
+        """Show or hide the help screen"""
+        self.help_mode = not self.help_mode
+        # Help is drawn once on the way in, it does not change until it is left
+        if self.help_mode:
+            self.draw_help()
+        else:
+            self.invalidate()
+
+    def handle_sigwinch(self, signum, frame):
+        """Note a terminal resize, to be handled by the main loop"""
+        self._resized = True
+        self.wake()
+
+    def apply_resize(self):
+        """Resize curses to the terminal if a resize has been noted"""
+        if not self._resized:
+            return
+        self._resized = False
+        columns, lines = os.get_terminal_size(sys.stdin.fileno())
+        curses.resizeterm(lines, columns)
+        self.handle_resize()
+
+    def handle_resize(self):
+        """Pick up the new terminal size and redraw everything"""
+        self.max_rows, self.max_cols = self.stdscr.getmaxyx()
+        self.invalidate()
+
+    def handle_key(self, key):
+        """Handle a single action key press from the main loop"""
+        handler = self._keymap.get(key)
+        if handler:
+            handler()
+
     def run(self):
         """Main loop"""
         self.draw_screen()
 
         while True:
-            key = self.stdscr.getch()
+            if self._dirty.is_set():
+                self._dirty.clear()
+                regions, self._dirty_regions = self._dirty_regions, set()
+                self.draw_screen(regions or None)
 
-            if key == ord('q'):
-                break
-            elif key == curses.KEY_MOUSE:
-                try:
-                    _, mx, my, _, _ = curses.getmouse()
-                    # Check if click is on header row (row 3)
-                    if my == 3:
-                        # Determine which column was clicked
-                        if 0 <= mx < 50:  # SNAPSHOT column
-                            self.toggle_sort('name')
-                        elif 50 <= mx < 60:  # USED column
-                            self.toggle_sort('used')
-                        elif 60 <= mx < 70:  # REFER column
-                            self.toggle_sort('refer')
-                        elif 70 <= mx < self.max_cols:  # CREATION column
-                            self.toggle_sort('creation')
-                except curses.error:
+            # Flush everything drawn since the last frame in one terminal update
+            curses.doupdate()
+
+            # Sleep until a key arrives or another thread or a resize wakes
+            # us up, then read everything that is waiting without blocking
+            try:
+                while os.read(self._wakeup_read, 4096):
                     pass
-            elif key == ord('h'):
-                self.help_mode = not self.help_mode
-            elif key == ord('r'):
-                self.refresh_snapshots()
-            elif key == ord('/'):
-                self.handle_filter()
-            elif key == ord('D'):
-                self.delete_snapshot()
-            elif key == ord('d'): 
-                self.show_snapshot_diff()
-            elif key == ord('m'):
-                self.mount_snapshot()
-            elif key == ord('u'):
-                self.unmount_snapshot()
-            elif key == ord('b'):
-                self.browse_snapshot()
-            elif key == ord('s'):
-                self.send_snapshot()
-            elif key == ord('a'):
-                self.add_remote_target()
-            elif key == curses.KEY_UP or key == ord('k'):
-                if self.current_pos > 0:
-                    self.current_pos -= 1
-            elif key == curses.KEY_DOWN or key == ord('j'):
-                if self.snapshots and self.current_pos < len(self.snapshots) - 1:
-                    self.current_pos += 1
-            elif key == curses.KEY_HOME or key == ord('g'):
-                self.current_pos = 0
-            elif key == curses.KEY_END or key == ord('G'):
-                if self.snapshots:
-                    self.current_pos = len(self.snapshots) - 1
-            elif key == curses.KEY_PPAGE:  # Page Up
-                self.current_pos = max(0, self.current_pos - (self.max_rows - 8))
-            elif key == curses.KEY_NPAGE:  # Page Down
-                if self.snapshots:
-                    self.current_pos = min(len(self.snapshots) - 1, self.current_pos + (self.max_rows - 8))
-
-            if not self.help_mode:
-                self.draw_screen()
+            except BlockingIOError:
+                pass
+            # Wake up in time to clear the status message when it expires
+            timeout = None
+            if self.status_message:
+                timeout = self.status_time + STATUS_TIMEOUT - time.time()
+                if timeout <= 0:
+                    self.status_message = ""
+                    self.invalidate('status')
+            # A resize noted while a prompt was open has already drained
+            # its wakeup byte, so it must not wait for another one
+            if not self._dirty.is_set() and not self._resized:
+                self._selector.select(timeout)
+
+            self.apply_resize()
+
+            self.stdscr.timeout(0)
+            key = self.stdscr.getch()
 
-def main(stdscr, pools=None):
-    manager = ZFSSnapshotManager(stdscr, pools)
-    manager.run()
+            # Handle every key that is already waiting (e.g. held down keys)
+            # before drawing again. Navigation keys only update the target
+            # position, the cursor is moved once for the whole batch.
+            pos = self.current_pos
+            n = len(self.snapshots)
+            page_step = self.max_rows - 8
+            while key != -1:
+                if key == KEY_QUIT:
+                    return
+
+                nav = self._navmap.get(key)
+                if self.help_mode and key != curses.KEY_RESIZE:
+                    # Any key leaves the help screen
+                    self.toggle_help()
+                elif nav:
+                    if n:
+                        pos = nav(pos, n, page_step)
+                else:
+                    self.move_cursor(pos)
+                    self.handle_key(key)
+                    # The action may have changed the list or the screen size
+                    pos = self.current_pos
+                    n = len(self.snapshots)
+                    page_step = self.max_rows - 8
+
+                # Prompts opened by an action may have changed the timeout
+                self.stdscr.timeout(0)
+                key = self.stdscr.getch()
+
+            self.move_cursor(pos)
+
+def main(stdscr, pools=None, max_depth=None):
+    manager = ZFSSnapshotManager(stdscr, pools, max_depth)
+    try:
+        manager.run()
+        manager.wait_for_send()
+    finally:
+        manager.close_diff_helper()
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="ZFS Snapshot Manager TUI")
     parser.add_argument("pools", nargs="*", help="ZFS pools to manage (default: all pools)")
+    parser.add_argument("-d", "--depth", type=int, default=None,
+                        help="Only list snapshots of datasets up to this many levels below each pool, "
+                             "0 for the pool's root dataset only (default: unlimited)")
     args = parser.parse_args()
+    if args.depth is not None and args.depth < 0:
+        parser.error("--depth must not be negative")
 
     try:
-        curses.wrapper(main, args.pools if args.pools else None)
+        curses.wrapper(main, args.pools if args.pools else None, args.depth)
     except KeyboardInterrupt:
         pass
 